@@ -34,6 +34,9 @@ setup(
     ],
     python_requires=">=3.7",
     install_requires=requirements,
+    extras_require={
+        "speedups": ["orjson>=3.6.0", "pyarrow>=10.0.0"],
+    },
     entry_points={
         "console_scripts": [
             "guest-list-app=guest_list_app.app:main",
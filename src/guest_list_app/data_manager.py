@@ -4,12 +4,19 @@ Handles CRUD operations, state management, and JSON serialization.
 """
 
 import json
-from dataclasses import asdict
-from typing import Dict, List, Optional, Set, Tuple
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, TypeVar, Union
 import streamlit as st
 
+try:
+    import orjson
+except ImportError:  # optional speedup, fall back to the standard library
+    orjson = None
+
 from .models import Person, Relationship, RelationshipType
 
+T = TypeVar("T")
+
 
 def init_state():
     """Initialize Streamlit session state with default values."""
@@ -21,6 +28,75 @@ def init_state():
         st.session_state.root: Optional[str] = None
     if "id_counter" not in st.session_state:
         st.session_state.id_counter = 1
+    if "people_version" not in st.session_state:
+        st.session_state.people_version = 0
+    if "rels_version" not in st.session_state:
+        st.session_state.rels_version = 0
+    if any(k not in st.session_state for k in ("children_map", "parents_map", "rel_keys", "rel_index", "rel_summaries")):
+        rebuild_indexes()
+    if "invited_count" not in st.session_state or "guest_count" not in st.session_state:
+        recount_guests()
+
+
+def cached_in_session(name: str, key: Any, build: Callable[[], T]) -> T:
+    """Return the value cached under ``name`` for this session, rebuilding it when ``key`` changes."""
+    cached = st.session_state.get(name)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    value = build()
+    st.session_state[name] = (key, value)
+    return value
+
+
+def _relationship_key(person1_id: str, person2_id: str, relationship_type: RelationshipType) -> Tuple[str, str, str]:
+    """Key used to detect duplicate relationships; undirected pairs are order-independent."""
+    if relationship_type is not RelationshipType.PARENT_CHILD and person2_id < person1_id:
+        person1_id, person2_id = person2_id, person1_id
+    return (person1_id, person2_id, relationship_type.value)
+
+
+def rebuild_indexes():
+    """Rebuild the adjacency maps, per-person relationship index and duplicate-check keys."""
+    children_map: Dict[str, List[str]] = defaultdict(list)
+    parents_map: Dict[str, List[str]] = defaultdict(list)
+    rel_index: Dict[str, List[Relationship]] = defaultdict(list)
+    rel_keys: Set[Tuple[str, str, str]] = set()
+    rels = st.session_state.rels
+    kept: List[Relationship] = []
+    for r in rels:
+        # Duplicates (e.g. from an imported file) are dropped so rels, rel_index and rel_keys stay one-to-one
+        key = _relationship_key(r.person1_id, r.person2_id, r.relationship_type)
+        if key in rel_keys:
+            continue
+        rel_keys.add(key)
+        kept.append(r)
+        rel_index[r.person1_id].append(r)
+        if r.person2_id != r.person1_id:
+            rel_index[r.person2_id].append(r)
+        if r.relationship_type is RelationshipType.PARENT_CHILD:
+            children_map[r.person1_id].append(r.person2_id)
+            parents_map[r.person2_id].append(r.person1_id)
+    if len(kept) != len(rels):
+        rels[:] = kept
+    st.session_state.children_map = children_map
+    st.session_state.parents_map = parents_map
+    st.session_state.rel_index = rel_index
+    st.session_state.rel_keys = rel_keys
+    st.session_state.rel_summaries = {}
+
+
+def recount_guests():
+    """Recompute the invited and guest (+1s) counters from scratch."""
+    people = st.session_state.people.values()
+    st.session_state.invited_count = sum(1 for p in people if p.invited)
+    st.session_state.guest_count = sum(1 + int(p.plus_one) for p in people if p.invited)
+
+
+def _adjust_guest_counts(person: Person, sign: int):
+    """Add (sign=1) or remove (sign=-1) a person's contribution to the guest counters."""
+    if person.invited:
+        st.session_state.invited_count += sign
+        st.session_state.guest_count += sign * (1 + int(person.plus_one))
 
 
 def new_person_id() -> str:
@@ -34,7 +110,7 @@ def add_person(name: str, side: str = "", notes: str = "", invited: bool = True,
                plus_one: bool = False, email: str = "", phone: str = "") -> str:
     """Add a new person to the system and return their ID."""
     pid = new_person_id()
-    st.session_state.people[pid] = Person(
+    person = Person(
         id=pid, 
         name=name.strip(), 
         side=side.strip(), 
@@ -44,19 +120,70 @@ def add_person(name: str, side: str = "", notes: str = "", invited: bool = True,
         email=email.strip(), 
         phone=phone.strip()
     )
+    st.session_state.people[pid] = person
+    _adjust_guest_counts(person, 1)
+    st.session_state.people_version += 1
     return pid
 
 
+def update_person(person: Person, **changes) -> bool:
+    """Apply field changes to a person and return whether anything changed."""
+    changed = False
+    _adjust_guest_counts(person, -1)
+    for attr, value in changes.items():
+        if getattr(person, attr) != value:
+            setattr(person, attr, value)
+            changed = True
+            if attr == "name":
+                # Related people's summaries mention this name
+                summaries = st.session_state.rel_summaries
+                for r in st.session_state.rel_index.get(person.id, ()):
+                    summaries.pop(r.person1_id, None)
+                    summaries.pop(r.person2_id, None)
+    _adjust_guest_counts(person, 1)
+    if changed:
+        st.session_state.people_version += 1
+    return changed
+
+
 def add_relationship(person1_id: str, person2_id: str, relationship_type: RelationshipType, notes: str = ""):
     """Add a relationship between two people."""
-    if person1_id in st.session_state.people and person2_id in st.session_state.people:
+    people = st.session_state.people
+    if person1_id in people and person2_id in people:
         # Avoid duplicates
-        for rel in st.session_state.rels:
-            if ((rel.person1_id == person1_id and rel.person2_id == person2_id) or 
-                (not rel.is_directed() and rel.person1_id == person2_id and rel.person2_id == person1_id)) and \
-               rel.relationship_type == relationship_type:
-                return
-        st.session_state.rels.append(Relationship(person1_id, person2_id, relationship_type, notes))
+        key = _relationship_key(person1_id, person2_id, relationship_type)
+        rel_keys = st.session_state.rel_keys
+        if key in rel_keys:
+            return
+        rel = Relationship(person1_id, person2_id, relationship_type, notes)
+        st.session_state.rels.append(rel)
+        rel_keys.add(key)
+        rel_index = st.session_state.rel_index
+        rel_index[person1_id].append(rel)
+        if person2_id != person1_id:
+            rel_index[person2_id].append(rel)
+        st.session_state.rel_summaries.pop(person1_id, None)
+        st.session_state.rel_summaries.pop(person2_id, None)
+        st.session_state.rels_version += 1
+        if rel.relationship_type is RelationshipType.PARENT_CHILD:
+            st.session_state.children_map[person1_id].append(person2_id)
+            st.session_state.parents_map[person2_id].append(person1_id)
+
+
+def remove_relationship(rel: Relationship):
+    """Remove a single relationship."""
+    # Match by identity, as rel_index does, rather than by dataclass equality
+    rels = st.session_state.rels
+    del rels[next(i for i, r in enumerate(rels) if r is rel)]
+    st.session_state.rel_keys.discard(_relationship_key(rel.person1_id, rel.person2_id, rel.relationship_type))
+    rel_index = st.session_state.rel_index
+    for pid in {rel.person1_id, rel.person2_id}:
+        rel_index[pid] = [r for r in rel_index[pid] if r is not rel]
+        st.session_state.rel_summaries.pop(pid, None)
+    if rel.relationship_type is RelationshipType.PARENT_CHILD:
+        st.session_state.children_map[rel.person1_id].remove(rel.person2_id)
+        st.session_state.parents_map[rel.person2_id].remove(rel.person1_id)
+    st.session_state.rels_version += 1
 
 
 def add_parent_child_relationship(parent_id: str, child_id: str):
@@ -66,141 +193,194 @@ def add_parent_child_relationship(parent_id: str, child_id: str):
 
 def delete_person(pid: str):
     """Delete a person and all their relationships."""
-    st.session_state.people.pop(pid, None)
-    st.session_state.rels = [r for r in st.session_state.rels if r.person1_id != pid and r.person2_id != pid]
+    person = st.session_state.people.pop(pid, None)
+    if person is not None:
+        _adjust_guest_counts(person, -1)
+
+    # Only the adjacency entries touching pid need updating
+    children_map = st.session_state.children_map
+    parents_map = st.session_state.parents_map
+    for child in children_map.pop(pid, ()):
+        parents_map[child] = [p for p in parents_map[child] if p != pid]
+    for parent in parents_map.pop(pid, ()):
+        children_map[parent] = [c for c in children_map[parent] if c != pid]
+
+    # Drop the person's relationships from the other endpoints' index entries and the key set
+    rel_index = st.session_state.rel_index
+    rel_keys = st.session_state.rel_keys
+    summaries = st.session_state.rel_summaries
+    summaries.pop(pid, None)
+    incident = rel_index.pop(pid, [])
+    for r in incident:
+        rel_keys.discard(_relationship_key(r.person1_id, r.person2_id, r.relationship_type))
+        other_id = r.person2_id if r.person1_id == pid else r.person1_id
+        summaries.pop(other_id, None)
+        if other_id in rel_index:
+            rel_index[other_id] = [x for x in rel_index[other_id] if x is not r]
+
+    # Filter in place so existing references to the list stay valid
+    if incident:
+        dropped = {id(r) for r in incident}
+        rels = st.session_state.rels
+        rels[:] = [r for r in rels if id(r) not in dropped]
+    st.session_state.people_version += 1
+    st.session_state.rels_version += 1
     if st.session_state.root == pid:
         st.session_state.root = None
 
 
 def edge_list() -> List[Tuple[str, str]]:
     """Get all parent-child relationships as a list of (parent, child) tuples."""
-    return [r.get_parent_child_pair() for r in st.session_state.rels if r.is_directed() and r.get_parent_child_pair()]
+    return [(p, c) for p, cs in st.session_state.children_map.items() for c in cs]
 
 
 def children_of(pid: str) -> List[str]:
     """Get all children of a given person."""
-    return [r.person2_id for r in st.session_state.rels if r.person1_id == pid and r.is_directed()]
+    return list(st.session_state.children_map.get(pid, ()))
 
 
 def parents_of(pid: str) -> List[str]:
     """Get all parents of a given person."""
-    return [r.person1_id for r in st.session_state.rels if r.person2_id == pid and r.is_directed()]
+    return list(st.session_state.parents_map.get(pid, ()))
 
 
 def get_relationships_for_person(pid: str) -> List[Relationship]:
     """Get all relationships involving a person."""
-    return [r for r in st.session_state.rels if r.person1_id == pid or r.person2_id == pid]
+    return list(st.session_state.rel_index.get(pid, ()))
 
 
 def get_related_people(pid: str, relationship_type: RelationshipType = None) -> List[str]:
     """Get all people related to a person, optionally filtered by relationship type."""
-    related = []
-    for r in st.session_state.rels:
-        if relationship_type and r.relationship_type != relationship_type:
-            continue
-        if r.person1_id == pid:
-            related.append(r.person2_id)
-        elif r.person2_id == pid:
-            related.append(r.person1_id)
-    return related
+    rels = st.session_state.rel_index.get(pid, ())
+    if relationship_type is None:
+        return [r.person2_id if r.person1_id == pid else r.person1_id for r in rels]
+    # Enum members are singletons, so compare by identity
+    return [r.person2_id if r.person1_id == pid else r.person1_id
+            for r in rels if r.relationship_type is relationship_type]
+
+
+def relationship_summary(pid: str) -> str:
+    """One-line summary of a person's relationships, cached until they or a related name change."""
+    summaries = st.session_state.rel_summaries
+    summary = summaries.get(pid)
+    if summary is None:
+        people = st.session_state.people
+        parts = []
+        for rel in st.session_state.rel_index.get(pid, ()):
+            other_person = people.get(rel.person2_id if rel.person1_id == pid else rel.person1_id)
+            if other_person:
+                parts.append(f"{rel.get_display_name()}: {other_person.name}")
+        summary = "; ".join(parts) if parts else "None"
+        summaries[pid] = summary
+    return summary
 
 
 def compute_unique_guest_count() -> int:
     """Count unique people marked invited=True; add +1 for each plus_one."""
-    total = sum(1 for p in st.session_state.people.values() if p.invited)
-    total += sum(1 for p in st.session_state.people.values() if p.invited and p.plus_one)
-    return total
+    return st.session_state.guest_count
+
+
+def compute_invited_count() -> int:
+    """Count people marked invited=True."""
+    return st.session_state.invited_count
 
 
 def to_json() -> str:
     """Export current state to JSON string."""
-    # Convert relationships to dict with enum values as strings
-    relationships_data = []
-    for r in st.session_state.rels:
-        rel_dict = asdict(r)
-        rel_dict['relationship_type'] = r.relationship_type.value  # Convert enum to string
-        relationships_data.append(rel_dict)
-    
     data = {
-        "people": [asdict(p) for p in st.session_state.people.values()],
-        "relationships": relationships_data,
+        "people": [p.to_json_dict() for p in st.session_state.people.values()],
+        "relationships": [r.to_json_dict() for r in st.session_state.rels],
         "root": st.session_state.root,
         "id_counter": st.session_state.id_counter,
     }
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2).decode("utf-8")
     return json.dumps(data, indent=2, ensure_ascii=False)
 
 
-def from_json(text: str):
-    """Import state from JSON string."""
-    raw = json.loads(text)
+def from_json(text: Union[str, bytes]):
+    """Import state from a JSON string or UTF-8 encoded bytes."""
+    raw = orjson.loads(text) if orjson is not None else json.loads(text)
     
-    # Load people
-    st.session_state.people = {p["id"]: Person(**p) for p in raw.get("people", [])}
+    # Parse everything before touching session state, so a bad file leaves the current data intact
+    people = {p["id"]: Person._from_mapping(p) for p in raw.get("people", [])}
     
     # Load relationships with proper enum conversion
-    st.session_state.rels = []
+    rels: List[Relationship] = []
     for r_data in raw.get("relationships", []):
         # Handle both old and new relationship formats
         if "parent" in r_data and "child" in r_data:
             # Old format - convert to new format
-            rel = Relationship(
-                person1_id=r_data["parent"],
-                person2_id=r_data["child"],
-                relationship_type=RelationshipType.PARENT_CHILD,
-                notes=r_data.get("notes", "")
-            )
-        else:
-            # New format
-            rel_type = RelationshipType(r_data["relationship_type"]) if isinstance(r_data["relationship_type"], str) else r_data["relationship_type"]
-            rel = Relationship(
-                person1_id=r_data["person1_id"],
-                person2_id=r_data["person2_id"],
-                relationship_type=rel_type,
-                notes=r_data.get("notes", "")
-            )
-        st.session_state.rels.append(rel)
+            r_data = {
+                "person1_id": r_data["parent"],
+                "person2_id": r_data["child"],
+                "relationship_type": RelationshipType.PARENT_CHILD,
+                "notes": r_data.get("notes", "")
+            }
+        rels.append(Relationship._from_mapping(r_data))
     
+    id_counter = raw.get("id_counter")
+    if id_counter is None:
+        id_counter = max((int(pid[1:]) for pid in people), default=0) + 1
+    id_counter = int(id_counter)
+    
+    st.session_state.people = people
+    st.session_state.rels = rels
     st.session_state.root = raw.get("root")
-    st.session_state.id_counter = int(raw.get("id_counter", max([int(pid[1:]) for pid in st.session_state.people.keys()], default=0) + 1))
+    st.session_state.id_counter = id_counter
+    rebuild_indexes()
+    recount_guests()
+    st.session_state.people_version += 1
+    st.session_state.rels_version += 1
+
+
+def _strip_str(value) -> str:
+    return str(value).strip()
+
+
+# (Person attribute, table column, converter) for editable table columns
+_TABLE_FIELDS = (
+    ("name", "Name", _strip_str),
+    ("side", "Side", _strip_str),
+    ("invited", "Invited", bool),
+    ("plus_one", "Plus One", bool),
+    ("email", "Email", _strip_str),
+    ("phone", "Phone", _strip_str),
+    ("notes", "Notes", _strip_str),
+)
+_TABLE_TEXT_COLUMNS = ("ID",) + tuple(col for _, col, conv in _TABLE_FIELDS if conv is _strip_str)
 
 
 def update_person_from_table_row(person: Person, row) -> None:
     """Update a person's attributes from a table row."""
-    person.name = str(row.get("Name", "")).strip()
-    person.side = str(row.get("Side", "")).strip()
-    person.invited = bool(row.get("Invited", False))
-    person.plus_one = bool(row.get("Plus One", False))
-    person.email = str(row.get("Email", "")).strip()
-    person.phone = str(row.get("Phone", "")).strip()
-    person.notes = str(row.get("Notes", "")).strip()
+    update_person(person, **{attr: conv(row.get(col, "")) for attr, col, conv in _TABLE_FIELDS})
 
 
 def process_table_edits(edited_df) -> None:
     """Process edits from the data editor table."""
-    existing_ids = set(st.session_state.people.keys())
+    people = st.session_state.people
+    existing_ids = set(people.keys())
     seen_ids: Set[str] = set()
 
-    for _, row in edited_df.iterrows():
-        rid = str(row.get("ID", "")).strip()
-        name = str(row.get("Name", "")).strip()
-        if not name:
-            continue  # ignore incomplete rows
-
-        if rid and rid in st.session_state.people:
+    # Normalize whole columns up front instead of converting cell by cell
+    df = edited_df.reindex(columns=[*_TABLE_TEXT_COLUMNS, "Invited", "Plus One"])
+    for col in _TABLE_TEXT_COLUMNS:
+        df[col] = df[col].fillna("").astype(str).str.strip()
+    # Empty checkbox cells default to invited / no plus one; masks avoid fillna's object downcasting
+    invited, plus_one = df["Invited"], df["Plus One"]
+    df["Invited"] = invited.isna() | invited.astype(bool)
+    df["Plus One"] = plus_one.notna() & plus_one.astype(bool)
+    df = df[df["Name"] != ""]  # ignore incomplete rows
+
+    for row in df.to_dict("records"):
+        rid = row["ID"]
+        if rid and rid in people:
             # Update existing person
-            update_person_from_table_row(st.session_state.people[rid], row)
+            update_person_from_table_row(people[rid], row)
             seen_ids.add(rid)
         else:
             # New row -> add new person
-            pid = add_person(
-                name=name,
-                side=str(row.get("Side", "")).strip(),
-                invited=bool(row.get("Invited", True)),
-                plus_one=bool(row.get("Plus One", False)),
-                email=str(row.get("Email", "")).strip(),
-                phone=str(row.get("Phone", "")).strip(),
-                notes=str(row.get("Notes", "")).strip(),
-            )
+            pid = add_person(**{attr: row[col] for attr, col, _ in _TABLE_FIELDS})
             seen_ids.add(pid)
 
     # Remove any people that were deleted in the editor
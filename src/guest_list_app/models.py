@@ -2,11 +2,25 @@
 Data models for the Guest List & Family Tree application.
 """
 
-from dataclasses import dataclass
+import sys
+from dataclasses import MISSING, dataclass, fields
 from enum import Enum
 from typing import List, Dict, Any
 
 
+# ``slots=True`` needs Python 3.10+; older interpreters fall back to a per-instance __dict__.
+_DATACLASS_OPTIONS: Dict[str, Any] = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+_DISPLAY_NAMES: Dict[str, str] = {
+    "parent_child": "Parent-Child",
+    "partner": "Partner",
+    "spouse": "Spouse",
+    "friend": "Friend",
+    "acquaintance": "Acquaintance",
+    "sibling": "Sibling"
+}
+
+
 class RelationshipType(Enum):
     """Types of relationships between people."""
     PARENT_CHILD = "parent_child"
@@ -18,17 +32,13 @@ class RelationshipType(Enum):
     
     @classmethod
     def get_display_names(cls) -> Dict[str, str]:
-        return {
-            cls.PARENT_CHILD.value: "Parent-Child",
-            cls.PARTNER.value: "Partner",
-            cls.SPOUSE.value: "Spouse",
-            cls.FRIEND.value: "Friend",
-            cls.ACQUAINTANCE.value: "Acquaintance",
-            cls.SIBLING.value: "Sibling"
-        }
+        return _DISPLAY_NAMES
 
 
-@dataclass
+_RELTYPE_BY_VALUE: Dict[str, RelationshipType] = {m.value: m for m in RelationshipType}
+
+
+@dataclass(**_DATACLASS_OPTIONS)
 class Person:
     """Represents a person in the guest list and family tree."""
     id: str
@@ -54,9 +64,34 @@ class Person:
             "Notes": self.notes,
             "Expanded": self.expanded
         }
+    
+    def to_json_dict(self) -> Dict[str, Any]:
+        """Convert person to dictionary for JSON export."""
+        return {
+            "id": self.id,
+            "name": self.name,
+            "side": self.side,
+            "notes": self.notes,
+            "invited": self.invited,
+            "plus_one": self.plus_one,
+            "email": self.email,
+            "phone": self.phone,
+            "expanded": self.expanded
+        }
+    
+    @classmethod
+    def _from_mapping(cls, data: Dict[str, Any]) -> "Person":
+        """Create a person from an exported record, skipping ``__init__``."""
+        obj = object.__new__(cls)
+        for name, default in _PERSON_FIELDS:
+            setattr(obj, name, data[name] if default is MISSING else data.get(name, default))
+        return obj
+
 
+_PERSON_FIELDS = tuple((f.name, f.default) for f in fields(Person))
 
-@dataclass
+
+@dataclass(**_DATACLASS_OPTIONS)
 class Relationship:
     """Represents a relationship between two people."""
     person1_id: str
@@ -68,16 +103,41 @@ class Relationship:
         if isinstance(self.relationship_type, str):
             self.relationship_type = RelationshipType(self.relationship_type)
     
+    def to_json_dict(self) -> Dict[str, Any]:
+        """Convert relationship to dictionary for JSON export."""
+        return {
+            "person1_id": self.person1_id,
+            "person2_id": self.person2_id,
+            "relationship_type": self.relationship_type.value,
+            "notes": self.notes
+        }
+    
+    @classmethod
+    def _from_mapping(cls, data: Dict[str, Any]) -> "Relationship":
+        """Create a relationship from an exported record, skipping ``__init__``/``__post_init__``."""
+        rel_type = data["relationship_type"]
+        obj = object.__new__(cls)
+        obj.person1_id = data["person1_id"]
+        obj.person2_id = data["person2_id"]
+        if isinstance(rel_type, str):
+            # Unknown values go through the enum so the error names the bad value
+            rel_type = _RELTYPE_BY_VALUE.get(rel_type) or RelationshipType(rel_type)
+        elif not isinstance(rel_type, RelationshipType):
+            rel_type = RelationshipType(rel_type)
+        obj.relationship_type = rel_type
+        obj.notes = data.get("notes", "")
+        return obj
+    
     def get_display_name(self) -> str:
         """Get human-readable relationship name."""
-        return RelationshipType.get_display_names()[self.relationship_type.value]
+        return _DISPLAY_NAMES[self.relationship_type.value]
     
     def is_directed(self) -> bool:
         """Check if relationship is directed (parent-child)."""
-        return self.relationship_type == RelationshipType.PARENT_CHILD
+        return self.relationship_type is RelationshipType.PARENT_CHILD
     
     def get_parent_child_pair(self) -> tuple:
         """For parent-child relationships, return (parent_id, child_id)."""
-        if self.relationship_type == RelationshipType.PARENT_CHILD:
+        if self.relationship_type is RelationshipType.PARENT_CHILD:
             return (self.person1_id, self.person2_id)
         return None
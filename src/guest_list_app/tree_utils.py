@@ -3,30 +3,35 @@ Tree-specific utilities for the Guest List & Family Tree application.
 Handles tree layout computation and graph operations.
 """
 
-from typing import Dict, List, Optional
+from collections import defaultdict, deque
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
 import streamlit as st
 
-from .data_manager import edge_list, parents_of
+from .data_manager import cached_in_session
+from .models import RelationshipType
 
 
-def compute_layout_levels(root_id: Optional[str]) -> Dict[str, int]:
+def compute_layout_levels(root_id: Optional[str]) -> Tuple[Dict[str, int], Dict[int, List[str]]]:
+    """Generation levels (and people grouped by level), recomputed only when the data or root changes."""
+    key = (st.session_state.people_version, st.session_state.rels_version, root_id)
+    return cached_in_session("_layout_levels_cache", key, lambda: _compute_layout_levels(root_id))
+
+
+def _compute_layout_levels(root_id: Optional[str]) -> Tuple[Dict[str, int], Dict[int, List[str]]]:
     """
     Simple BFS levels from root to help group nodes in Graphviz rank by generation.
     If root is None, try to infer nodes with no parents as roots and choose arbitrarily.
+    Returns the level of each node and the nodes at each level.
     """
-    graph = edge_list()
-    rev_parents = {}
-    for p, c in graph:
-        rev_parents.setdefault(c, []).append(p)
+    children_map = st.session_state.children_map
+    parents_map = st.session_state.parents_map
 
     nodes = list(st.session_state.people.keys())
     if not nodes:
-        return {}
+        return {}, {}
 
-    roots: List[str] = []
-    for n in nodes:
-        if len(rev_parents.get(n, [])) == 0:
-            roots.append(n)
+    roots: List[str] = [n for n in nodes if not parents_map.get(n)]
 
     if root_id and root_id in nodes:
         start = root_id
@@ -37,74 +42,84 @@ def compute_layout_levels(root_id: Optional[str]) -> Dict[str, int]:
 
     # BFS from start
     levels = {start: 0}
-    queue = [start]
+    by_level: Dict[int, List[str]] = defaultdict(list)
+    by_level[0].append(start)
+    queue = deque([start])
     while queue:
-        current = queue.pop(0)
+        current = queue.popleft()
         current_level = levels[current]
         
         # Find children
-        for parent, child in graph:
-            if parent == current and child not in levels:
+        for child in children_map.get(current, ()):
+            if child not in levels:
                 levels[child] = current_level + 1
+                by_level[current_level + 1].append(child)
                 queue.append(child)
 
     # Handle disconnected components
     for n in nodes:
         if n not in levels:
             levels[n] = 0
+            by_level[0].append(n)
+
+    return levels, by_level
 
-    return levels
 
+# DOT attributes for each relationship type's edges
+_EDGE_ATTRS: Dict[RelationshipType, str] = {
+    RelationshipType.PARENT_CHILD: 'color=black style=solid',
+    RelationshipType.SPOUSE: 'color=red style=bold dir=none label="spouse"',
+    RelationshipType.PARTNER: 'color=purple style=dashed dir=none label="partner"',
+    RelationshipType.SIBLING: 'color=blue style=dotted dir=none label="sibling"',
+    RelationshipType.FRIEND: 'color=green style=dashed dir=none label="friend"',
+    RelationshipType.ACQUAINTANCE: 'color=gray style=dotted dir=none label="acquaintance"',
+}
 
-def create_family_tree_graph() -> 'graphviz.Digraph':
-    """Create a Graphviz digraph for the family tree visualization."""
-    import graphviz
+
+def _dot_escape(text: str) -> str:
+    """Escape text for use inside a double-quoted DOT string."""
+    return text.replace("\\", "\\\\").replace('"', '\\"')
+
+
+@lru_cache(maxsize=4096)
+def _node_style(name: str, side: str, invited: bool, plus_one: bool) -> Tuple[str, str]:
+    """Return the (escaped label, fill color) used for a person's node."""
+    label = _dot_escape(name)
+    if side:
+        label += f"\\n({_dot_escape(side)})"
     
-    g = graphviz.Digraph("FamilyTree", format="svg")
-    g.attr(rankdir="TB", fontsize="10")
+    # Color coding
+    if invited:
+        color = "lightblue" if not plus_one else "lightgreen"
+    else:
+        color = "lightgray"
+    return label, color
+
+
+def create_family_tree_source() -> str:
+    """Create the Graphviz DOT source for the family tree visualization."""
+    # Emit the DOT text directly rather than one Digraph.node/edge call per entity
+    lines = ["digraph FamilyTree {", "\trankdir=TB fontsize=10"]
 
     # Add nodes with styling
     for pid, person in st.session_state.people.items():
-        label = f"{person.name}"
-        if person.side:
-            label += f"\\n({person.side})"
-        
-        # Color coding
-        if person.invited:
-            color = "lightblue" if not person.plus_one else "lightgreen"
-        else:
-            color = "lightgray"
-        
-        g.node(pid, label=label, style="filled", fillcolor=color, fontsize="9")
+        label, color = _node_style(person.name, person.side, person.invited, person.plus_one)
+        lines.append(f'\t"{_dot_escape(pid)}" [label="{label}" fillcolor={color} fontsize=9 style=filled]')
 
     # Add edges for different relationship types
     for rel in st.session_state.rels:
-        if rel.is_directed():  # Parent-child relationships
-            parent_id, child_id = rel.get_parent_child_pair()
-            g.edge(parent_id, child_id, color="black", style="solid")
-        else:  # Other relationships (spouse, partner, friend, etc.)
-            # Use different styling for different relationship types
-            if rel.relationship_type.value == "spouse":
-                g.edge(rel.person1_id, rel.person2_id, color="red", style="bold", dir="none", label="spouse")
-            elif rel.relationship_type.value == "partner":
-                g.edge(rel.person1_id, rel.person2_id, color="purple", style="dashed", dir="none", label="partner")
-            elif rel.relationship_type.value == "sibling":
-                g.edge(rel.person1_id, rel.person2_id, color="blue", style="dotted", dir="none", label="sibling")
-            elif rel.relationship_type.value == "friend":
-                g.edge(rel.person1_id, rel.person2_id, color="green", style="dashed", dir="none", label="friend")
-            elif rel.relationship_type.value == "acquaintance":
-                g.edge(rel.person1_id, rel.person2_id, color="gray", style="dotted", dir="none", label="acquaintance")
+        lines.append(f'\t"{_dot_escape(rel.person1_id)}" -> "{_dot_escape(rel.person2_id)}" [{_EDGE_ATTRS[rel.relationship_type]}]')
 
     # Rank by levels to keep generations aligned
-    levels = compute_layout_levels(st.session_state.root)
-    by_level: Dict[int, List[str]] = {}
-    for nid, lvl in levels.items():
-        by_level.setdefault(lvl, []).append(nid)
-
+    _, by_level = compute_layout_levels(st.session_state.root)
     for lvl, nodes in by_level.items():
-        with g.subgraph() as s:
-            s.attr(rank="same")
-            for n in nodes:
-                s.node(n)
+        lines.append("\t{ rank=same " + " ".join(f'"{_dot_escape(n)}"' for n in nodes) + " }")
+
+    lines.append("}")
+    return "\n".join(lines)
+
 
-    return g
+def get_family_tree_source() -> str:
+    """Return the family tree DOT source, rebuilt only when people, relationships or the root change."""
+    key = (st.session_state.people_version, st.session_state.rels_version, st.session_state.root)
+    return cached_in_session("_tree_source_cache", key, create_family_tree_source)
@@ -3,18 +3,37 @@ UI components for the Guest List & Family Tree application.
 Contains reusable Streamlit UI functions.
 """
 
-import pandas as pd
+import io
 import streamlit as st
-from typing import Dict, List
-from st_aggrid import AgGrid, GridOptionsBuilder, DataReturnMode, GridUpdateMode, ColumnsAutoSizeMode
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+# Heavy packages are imported where they are used. st_aggrid only loads once the Table view
+# is opened; pandas, numpy and pyarrow still load on the first run, since the guest list export always renders
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
 
 from .data_manager import (
     add_person, add_relationship, add_parent_child_relationship, delete_person, 
-    compute_unique_guest_count, to_json, from_json,
-    process_table_edits, get_relationships_for_person, get_related_people
+    remove_relationship, compute_unique_guest_count, compute_invited_count, to_json, from_json,
+    process_table_edits, get_relationships_for_person, get_related_people, update_person,
+    relationship_summary, cached_in_session
 )
 from .models import RelationshipType
-from .tree_utils import create_family_tree_graph
+from .tree_utils import get_family_tree_source
+
+# Relationship type selectbox options and their reverse lookup, built once at import
+_DISPLAY_NAMES = RelationshipType.get_display_names()
+_DISPLAY_VALUES = list(_DISPLAY_NAMES.values())
+_REVERSE_DISPLAY = {v: RelationshipType(k) for k, v in _DISPLAY_NAMES.items()}
+
+
+def _person_options() -> Tuple[List[str], Dict[str, str]]:
+    """Selectbox labels and label -> ID map for all people, rebuilt only when people change."""
+    def build():
+        label_to_pid = {f"{p.name} ({pid})": pid for pid, p in st.session_state.people.items()}
+        return list(label_to_pid), label_to_pid
+    return cached_in_session("_person_options_cache", st.session_state.people_version, build)
 
 
 def render_sidebar():
@@ -24,7 +43,11 @@ def render_sidebar():
         
         # Export
         if st.session_state.people:
-            json_data = to_json()
+            json_data = cached_in_session(
+                "_export_json_cache",
+                (st.session_state.people_version, st.session_state.rels_version, st.session_state.root),
+                to_json
+            )
             st.download_button(
                 "⬇️ Export JSON", 
                 json_data, 
@@ -36,8 +59,8 @@ def render_sidebar():
         uploaded = st.file_uploader("📤 Import JSON", type=["json"])
         if uploaded:
             try:
-                content = uploaded.read().decode("utf-8")
-                from_json(content)
+                # Parse the uploaded bytes directly rather than decoding a second copy first
+                from_json(uploaded.getvalue())
                 st.success("✅ Imported successfully!")
                 st.rerun()
             except Exception as e:
@@ -48,10 +71,12 @@ def render_sidebar():
         # Root selection
         st.header("🌳 Tree Root")
         if st.session_state.people:
-            all_opts = {"(auto)": None}
-            all_opts.update({f"{p.name} ({pid})": pid for pid, p in st.session_state.people.items()})
-            selected = st.selectbox("Choose a root for the tree (optional)", list(all_opts.keys()))
-            st.session_state.root = all_opts[selected]
+            labels, label_to_pid = _person_options()
+            root_labels = cached_in_session(
+                "_root_options_cache", st.session_state.people_version, lambda: ["(auto)"] + labels
+            )
+            selected = st.selectbox("Choose a root for the tree (optional)", root_labels)
+            st.session_state.root = label_to_pid.get(selected)
 
 
 def render_add_person_form():
@@ -83,23 +108,22 @@ def render_add_relationship_form():
     st.subheader("👨‍👩‍👧‍👦 Add Relationship")
     
     if len(st.session_state.people) >= 2:
-        people_opts = {f"{p.name} ({pid})": pid for pid, p in st.session_state.people.items()}
+        labels, people_opts = _person_options()
         
         # Relationship type selection
-        relationship_types = RelationshipType.get_display_names()
-        rel_type_display = st.selectbox("Relationship Type", list(relationship_types.values()))
-        rel_type = next(k for k, v in relationship_types.items() if v == rel_type_display)
+        rel_type_display = st.selectbox("Relationship Type", _DISPLAY_VALUES)
+        rel_type = _REVERSE_DISPLAY[rel_type_display]
         
         # Person selection based on relationship type
-        if RelationshipType(rel_type) == RelationshipType.PARENT_CHILD:
+        if rel_type is RelationshipType.PARENT_CHILD:
             person1_label = "Parent"
             person2_label = "Child"
         else:
             person1_label = "Person 1"
             person2_label = "Person 2"
             
-        person1_choice = st.selectbox(person1_label, options=list(people_opts.keys()))
-        person2_choice = st.selectbox(person2_label, options=list(people_opts.keys()))
+        person1_choice = st.selectbox(person1_label, options=labels)
+        person2_choice = st.selectbox(person2_label, options=labels)
         
         notes = st.text_area("Notes (optional)", placeholder="Additional notes about this relationship...")
         
@@ -107,7 +131,7 @@ def render_add_relationship_form():
             if people_opts[person1_choice] == people_opts[person2_choice]:
                 st.error("Cannot create a relationship between the same person.")
             else:
-                add_relationship(people_opts[person1_choice], people_opts[person2_choice], RelationshipType(rel_type), notes)
+                add_relationship(people_opts[person1_choice], people_opts[person2_choice], rel_type, notes)
                 st.success(f"✅ {rel_type_display} relationship added!")
                 st.rerun()
     else:
@@ -122,7 +146,10 @@ def render_delete_person_section():
     if st.session_state.people:
         del_choice = st.selectbox(
             "Choose person to delete", 
-            options=["(none)"] + list(st.session_state.people.keys()),
+            options=cached_in_session(
+                "_delete_options_cache", st.session_state.people_version,
+                lambda: ["(none)"] + list(st.session_state.people.keys())
+            ),
             format_func=lambda pid: "(none)" if pid == "(none)" else f"{st.session_state.people[pid].name} ({pid})"
         )
         if del_choice != "(none)" and st.button("Delete Selected"):
@@ -133,7 +160,7 @@ def render_delete_person_section():
 def render_metrics():
     """Render the metrics display."""
     total_people = len(st.session_state.people)
-    total_invited = sum(1 for p in st.session_state.people.values() if p.invited)
+    total_invited = compute_invited_count()
     total_with_plus_ones = compute_unique_guest_count()
 
     m1, m2, m3 = st.columns(3)
@@ -144,44 +171,40 @@ def render_metrics():
 
 def render_tree_view():
     """Render the family tree visualization."""
-    g = create_family_tree_graph()
-    st.graphviz_chart(g)
+    st.graphviz_chart(get_family_tree_source())
 
 
-def render_table_view():
-    """Render the enhanced editable table view with AgGrid."""
-    st.subheader("📊 People & Relationships Table")
+_TABLE_COLUMNS = ("ID", "Name", "Side", "Invited", "Plus One", "Email", "Phone", "Notes", "Relationships", "Expanded")
+
+
+def _side_name_order(sides: "pd.Categorical", names) -> "np.ndarray":
+    """Row permutation sorting by (Side, Name); Side is compared by its integer category codes."""
+    import numpy as np
     
-    if not st.session_state.people:
-        st.info("No people added yet. Add some people to see the table.")
-        return
+    return np.lexsort((np.array(names, dtype=str), sides.codes))
+
+
+def _build_table_frame() -> "pd.DataFrame":
+    """People table sorted by (Side, Name), built column-wise rather than from per-row dicts."""
+    import pandas as pd
     
-    # Create enhanced DataFrame with relationship information
-    table_data = []
-    for person in st.session_state.people.values():
-        # Get relationships for this person
-        relationships = get_relationships_for_person(person.id)
-        rel_summary = []
-        for rel in relationships:
-            other_person_id = rel.person2_id if rel.person1_id == person.id else rel.person1_id
-            other_person = st.session_state.people.get(other_person_id)
-            if other_person:
-                rel_summary.append(f"{rel.get_display_name()}: {other_person.name}")
-        
-        table_data.append({
-            "ID": person.id,
-            "Name": person.name,
-            "Side": person.side,
-            "Invited": person.invited,
-            "Plus One": person.plus_one,
-            "Email": person.email,
-            "Phone": person.phone,
-            "Notes": person.notes,
-            "Relationships": "; ".join(rel_summary) if rel_summary else "None",
-            "Expanded": person.expanded
-        })
+    rows = [
+        (p.id, p.name, p.side, p.invited, p.plus_one, p.email, p.phone, p.notes,
+         relationship_summary(p.id), p.expanded)
+        for p in st.session_state.people.values()
+    ]
+    columns = {name: list(values) for name, values in zip(_TABLE_COLUMNS, zip(*rows))}
+    # Side stays plain text in the editable grid (a categorical would turn new values into NaN
+    # when the grid casts edits back); its categorical codes are only used for sorting
+    order = _side_name_order(pd.Categorical(columns["Side"]), columns["Name"])
+    return pd.DataFrame(columns).iloc[order].reset_index(drop=True)
+
+
+def _build_table_grid() -> Tuple["pd.DataFrame", Dict]:
+    """Build the people table and its AgGrid options."""
+    from st_aggrid import GridOptionsBuilder
     
-    df = pd.DataFrame(table_data).sort_values(by=["Side", "Name"]).reset_index(drop=True)
+    df = _build_table_frame()
     
     # Configure AgGrid
     gb = GridOptionsBuilder.from_dataframe(df)
@@ -206,7 +229,27 @@ def render_table_view():
     # Add double-click functionality for expand/collapse
     gb.configure_grid_options(onCellDoubleClicked="function(params) { if(params.colDef.field === 'Expanded') { params.node.setDataValue('Expanded', !params.data.Expanded); } }")
     
-    grid_options = gb.build()
+    return df, gb.build()
+
+
+def _table_grid() -> Tuple["pd.DataFrame", Dict]:
+    """People table and AgGrid options, rebuilt only when people or relationships change."""
+    key = (st.session_state.people_version, st.session_state.rels_version)
+    return cached_in_session("_table_grid_cache", key, _build_table_grid)
+
+
+def render_table_view():
+    """Render the enhanced editable table view with AgGrid."""
+    from st_aggrid import AgGrid, DataReturnMode, GridUpdateMode, ColumnsAutoSizeMode
+    
+    st.subheader("📊 People & Relationships Table")
+    
+    if not st.session_state.people:
+        st.info("No people added yet. Add some people to see the table.")
+        return
+    
+    # Table data and grid configuration are reused until the data changes
+    df, grid_options = _table_grid()
     
     # Render AgGrid
     grid_response = AgGrid(
@@ -230,20 +273,38 @@ def render_table_view():
         render_relationship_manager(selected_person_id)
 
 
+# (Person attribute, grid column, converter) for columns the grid can edit
+_GRID_FIELDS = (
+    ("name", "Name", str),
+    ("side", "Side", str),
+    ("invited", "Invited", bool),
+    ("plus_one", "Plus One", bool),
+    ("email", "Email", str),
+    ("phone", "Phone", str),
+    ("notes", "Notes", str),
+    ("expanded", "Expanded", bool),
+)
+
+
 def process_aggrid_edits(edited_df):
     """Process edits from the AgGrid table."""
-    for _, row in edited_df.iterrows():
-        person_id = row['ID']
-        if person_id in st.session_state.people:
-            person = st.session_state.people[person_id]
-            person.name = str(row['Name'])
-            person.side = str(row['Side'])
-            person.invited = bool(row['Invited'])
-            person.plus_one = bool(row['Plus One'])
-            person.email = str(row['Email'])
-            person.phone = str(row['Phone'])
-            person.notes = str(row['Notes'])
-            person.expanded = bool(row['Expanded'])
+    import numpy as np
+    
+    people = st.session_state.people
+    ids = edited_df["ID"].to_numpy()
+    
+    # Diff whole columns against the table the grid was given; only differing rows are applied
+    current, _ = _table_grid()
+    current = current.set_index("ID").reindex(ids)
+    changed = np.zeros(len(edited_df), dtype=bool)
+    for _, col, conv in _GRID_FIELDS:
+        changed |= edited_df[col].astype(conv).to_numpy() != current[col].astype(conv).to_numpy()
+    
+    for i in np.flatnonzero(changed):
+        person = people.get(ids[i])
+        if person is not None:
+            row = edited_df.iloc[i]
+            update_person(person, **{attr: conv(row[col]) for attr, col, conv in _GRID_FIELDS})
 
 
 def render_relationship_manager(person_id: str):
@@ -255,46 +316,108 @@ def render_relationship_manager(person_id: str):
     st.markdown("---")
     st.subheader(f"🔗 Relationships for {person.name}")
     
-    # Display current relationships
-    relationships = get_relationships_for_person(person_id)
+    # Display current relationships; removals are batched in one form so they cost a single rerun
+    people = st.session_state.people
+    relationships = []
+    for rel in get_relationships_for_person(person_id):
+        other_person = people.get(rel.person2_id if rel.person1_id == person_id else rel.person1_id)
+        if other_person:
+            relationships.append((rel, other_person))
     if relationships:
-        st.write("**Current Relationships:**")
-        for rel in relationships:
-            other_person_id = rel.person2_id if rel.person1_id == person_id else rel.person1_id
-            other_person = st.session_state.people.get(other_person_id)
-            if other_person:
-                col1, col2 = st.columns([3, 1])
-                with col1:
-                    st.write(f"• {rel.get_display_name()}: {other_person.name}")
-                    if rel.notes:
-                        st.write(f"  *{rel.notes}*")
-                with col2:
-                    if st.button(f"🗑️ Remove", key=f"remove_{rel.person1_id}_{rel.person2_id}_{rel.relationship_type.value}"):
-                        st.session_state.rels.remove(rel)
-                        st.rerun()
+        with st.form(f"remove_rels_form_{person_id}"):
+            st.write("**Current Relationships:**")
+            for rel, other_person in relationships:
+                st.write(f"• {rel.get_display_name()}: {other_person.name}")
+                if rel.notes:
+                    st.write(f"  *{rel.notes}*")
+            to_remove = st.multiselect(
+                "Select relationships to remove",
+                options=range(len(relationships)),
+                format_func=lambda i: f"{relationships[i][0].get_display_name()}: {relationships[i][1].name}"
+            )
+            if st.form_submit_button("🗑️ Remove Selected") and to_remove:
+                for i in to_remove:
+                    remove_relationship(relationships[i][0])
+                st.rerun()
     else:
         st.write("No relationships found.")
     
     # Quick add relationship form
     st.write("**Add New Relationship:**")
-    col1, col2, col3 = st.columns([2, 2, 1])
+    labels, label_to_pid = _person_options()
+    other_labels = cached_in_session(
+        "_other_people_cache", (st.session_state.people_version, person_id),
+        lambda: [label for label in labels if label_to_pid[label] != person_id]
+    )
+    with st.form(f"rel_form_{person_id}", clear_on_submit=True):
+        col1, col2, col3 = st.columns([2, 2, 1])
+        
+        with col1:
+            if other_labels:
+                other_person_choice = st.selectbox("Connect to", other_labels, key=f"rel_person_{person_id}")
+        
+        with col2:
+            rel_type_display = st.selectbox("Relationship", _DISPLAY_VALUES, key=f"rel_type_{person_id}")
+        
+        with col3:
+            submitted = st.form_submit_button("Add", disabled=not other_labels)
+        
+        if submitted and other_labels:
+            other_person_id = label_to_pid[other_person_choice]
+            add_relationship(person_id, other_person_id, _REVERSE_DISPLAY[rel_type_display])
+            st.success("Relationship added!")
+            st.rerun()
+
+
+def _to_csv_bytes(df: "pd.DataFrame") -> bytes:
+    """Encode a DataFrame as CSV, using Arrow's multi-threaded writer when it is installed."""
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pa_csv
+    except ImportError:  # optional speedup, fall back to pandas' CSV writer
+        return df.to_csv(index=False).encode("utf-8")
+    buf = io.BytesIO()
+    pa_csv.write_csv(pa.Table.from_pandas(df.astype(str), preserve_index=False), buf)
+    return buf.getvalue()
+
+
+def _build_guest_list_export(incl_only: bool) -> Tuple["pd.DataFrame", bytes]:
+    """Build the guest list export table and its CSV bytes."""
+    import numpy as np
+    import pandas as pd
     
-    with col1:
-        other_people = {f"{p.name} ({pid})": pid for pid, p in st.session_state.people.items() if pid != person_id}
-        if other_people:
-            other_person_choice = st.selectbox("Connect to", list(other_people.keys()), key=f"rel_person_{person_id}")
+    people = st.session_state.people
+    n = len(people)
+    names, sides, emails, phones, notes, plus_ones = (np.empty(n, dtype=object) for _ in range(6))
     
-    with col2:
-        relationship_types = RelationshipType.get_display_names()
-        rel_type_display = st.selectbox("Relationship", list(relationship_types.values()), key=f"rel_type_{person_id}")
-        rel_type = next(k for k, v in relationship_types.items() if v == rel_type_display)
+    # Fill preallocated columns, then trim to the rows actually kept
+    k = 0
+    for p in people.values():
+        if incl_only and not p.invited:
+            continue
+        names[k] = p.name
+        sides[k] = p.side
+        emails[k] = p.email
+        phones[k] = p.phone
+        notes[k] = p.notes
+        plus_ones[k] = "Yes" if (p.invited and p.plus_one) else "No"
+        k += 1
     
-    with col3:
-        if other_people and st.button("Add", key=f"add_rel_{person_id}"):
-            other_person_id = other_people[other_person_choice]
-            add_relationship(person_id, other_person_id, RelationshipType(rel_type))
-            st.success("Relationship added!")
-            st.rerun()
+    export_df = pd.DataFrame({
+        "Name": names[:k],
+        "Side": sides[:k],
+        "Email": emails[:k],
+        "Phone": phones[:k],
+        "Notes": notes[:k],
+        "PlusOne": plus_ones[:k]
+    })
+    if not export_df.empty:
+        # Low-cardinality columns sort and store faster as categoricals
+        export_df["Side"] = pd.Categorical(sides[:k])
+        export_df["PlusOne"] = pd.Categorical(export_df["PlusOne"], categories=["No", "Yes"], ordered=True)
+        order = _side_name_order(export_df["Side"].array, names[:k])
+        export_df = export_df.iloc[order].reset_index(drop=True)
+    return export_df, _to_csv_bytes(export_df)
 
 
 def render_guest_list_export():
@@ -303,27 +426,15 @@ def render_guest_list_export():
     st.subheader("📝 Quick Guest List Export")
     
     incl_only = st.checkbox("Include invited-only", value=True)
-    data = []
-    
-    for p in st.session_state.people.values():
-        if incl_only and not p.invited:
-            continue
-        data.append({
-            "Name": p.name,
-            "Side": p.side,
-            "Email": p.email,
-            "Phone": p.phone,
-            "Notes": p.notes,
-            "PlusOne": "Yes" if (p.invited and p.plus_one) else "No"
-        })
-    
-    export_df = pd.DataFrame(data)
-    if not export_df.empty:
-        export_df = export_df.sort_values(by=["Side", "Name"]).reset_index(drop=True)
+    export_df, csv_data = cached_in_session(
+        "_guest_list_export_cache",
+        (st.session_state.people_version, incl_only),
+        lambda: _build_guest_list_export(incl_only)
+    )
     st.dataframe(export_df, use_container_width=True)
     st.download_button(
         "⬇️ Download Guest List (CSV)", 
-        export_df.to_csv(index=False), 
+        csv_data, 
         "guest_list.csv", 
         "text/csv"
     )